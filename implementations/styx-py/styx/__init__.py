@@ -1,6 +1,6 @@
 """Styx configuration language parser for Python."""
 
-from .lexer import Lexer, Token, TokenType
+from .lexer import Lexer, Token, TokenArrays, TokenType
 from .parser import Parser, parse
 from .types import (
     Document,
@@ -30,6 +30,7 @@ __all__ = [
     "StyxObject",
     "Tag",
     "Token",
+    "TokenArrays",
     "TokenType",
     "Value",
     "parse",
@@ -3,8 +3,12 @@
 
 from __future__ import annotations
 
+import os
 import sys
+from functools import partial
+from multiprocessing import Pool
 from pathlib import Path
+from typing import TYPE_CHECKING, Final
 
 from .parser import Parser
 from .types import (
@@ -18,9 +22,15 @@ from .types import (
     Value,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
 
 def escape_string(s: str) -> str:
     """Escape a string for sexp output."""
+    # Chained str.replace beats str.translate here: a replace that finds nothing returns
+    # the string itself without copying, while translate always rebuilds it (and falls
+    # off its ASCII fast path for any non-ASCII text).
     return (
         s.replace("\\", "\\\\")
         .replace('"', '\\"')
@@ -30,69 +40,122 @@ def escape_string(s: str) -> str:
     )
 
 
-def format_value(value: Value, indent: int) -> str:
-    """Format a value as sexp."""
-    prefix = "  " * indent
+# Indentation prefixes for the usual nesting depths, so they aren't rebuilt per node
+INDENT_PREFIXES: Final[tuple[str, ...]] = tuple("  " * depth for depth in range(64))
 
-    # Unit value (no tag, no payload)
-    if value.tag is None and value.payload is None:
-        return f"(unit [{value.span.start}, {value.span.end}])"
 
-    # Tag only (no payload)
-    if value.tag is not None and value.payload is None:
-        return f'(tag [{value.span.start}, {value.span.end}] "{value.tag.name}")'
+def indent_prefix(indent: int) -> str:
+    """Return the whitespace prefix for a nesting depth."""
+    if indent < len(INDENT_PREFIXES):
+        return INDENT_PREFIXES[indent]
+    return "  " * indent
+
+
+def write_value(out: list[str], value: Value, indent: int) -> None:
+    """Append the sexp for a value to out."""
+    span = value.span
+
+    if value.tag is not None:
+        # Tag only (no payload)
+        if value.payload is None:
+            out.append(f'(tag [{span.start}, {span.end}] "{value.tag.name}")')
+            return
 
-    # Tag with payload
-    if value.tag is not None and value.payload is not None:
-        payload_str = format_payload(value.payload, indent + 1)
-        return f'(tag [{value.span.start}, {value.span.end}] "{value.tag.name}"\n{prefix}  {payload_str})'
+        # Tag with payload
+        out.append(f'(tag [{span.start}, {span.end}] "{value.tag.name}"\n{indent_prefix(indent)}  ')
+        write_payload(out, value.payload, indent + 1)
+        out.append(")")
+        return
 
     # Just payload
     if value.payload is not None:
-        return format_payload(value.payload, indent)
+        write_payload(out, value.payload, indent)
+        return
 
-    return f"(unit [{value.span.start}, {value.span.end}])"
+    # Unit value (no tag, no payload)
+    out.append(f"(unit [{span.start}, {span.end}])")
 
 
-def format_payload(payload: Payload, indent: int) -> str:
-    """Format a payload as sexp."""
-    prefix = "  " * indent
+def write_payload(out: list[str], payload: Payload, indent: int) -> None:
+    """Append the sexp for a payload to out."""
+    prefix = indent_prefix(indent)
+    span = payload.span
 
     if isinstance(payload, Scalar):
         escaped = escape_string(payload.text)
-        return (
-            f'(scalar [{payload.span.start}, {payload.span.end}] {payload.kind.value} "{escaped}")'
-        )
+        out.append(f'(scalar [{span.start}, {span.end}] {payload.kind.value} "{escaped}")')
+        return
 
     if isinstance(payload, Sequence):
         if not payload.items:
-            return f"(sequence [{payload.span.start}, {payload.span.end}])"
-        items = "\n".join(f"{prefix}  {format_value(item, indent + 1)}" for item in payload.items)
-        return f"(sequence [{payload.span.start}, {payload.span.end}]\n{items})"
+            out.append(f"(sequence [{span.start}, {span.end}])")
+            return
+        out.append(f"(sequence [{span.start}, {span.end}]")
+        for item in payload.items:
+            out.append(f"\n{prefix}  ")
+            write_value(out, item, indent + 1)
+        out.append(")")
+        return
 
     if isinstance(payload, StyxObject):
         if not payload.entries:
-            return f"(object [{payload.span.start}, {payload.span.end}])"
-        entries_str = "\n".join(format_entry(entry, indent + 1) for entry in payload.entries)
-        return f"(object [{payload.span.start}, {payload.span.end}]\n{entries_str}\n{prefix})"
+            out.append(f"(object [{span.start}, {span.end}])")
+            return
+        out.append(f"(object [{span.start}, {span.end}]")
+        for entry in payload.entries:
+            out.append("\n")
+            write_entry(out, entry, indent + 1)
+        out.append(f"\n{prefix})")
+        return
+
+    out.append("(unknown)")
+
+
+def write_entry(out: list[str], entry: Entry, indent: int) -> None:
+    """Append the sexp for an entry to out."""
+    prefix = indent_prefix(indent)
+    out.append(f"{prefix}(entry\n{prefix}  ")
+    write_value(out, entry.key, indent + 1)
+    out.append(f"\n{prefix}  ")
+    write_value(out, entry.value, indent + 1)
+    out.append(")")
+
 
-    return "(unknown)"
+def write_document(out: list[str], doc: Document) -> None:
+    """Append the sexp for a document to out."""
+    out.append("(document [-1, -1]")
+    for entry in doc.entries:
+        out.append("\n")
+        write_entry(out, entry, 1)
+    out.append("\n)")
+
+
+def format_value(value: Value, indent: int) -> str:
+    """Format a value as sexp."""
+    out: list[str] = []
+    write_value(out, value, indent)
+    return "".join(out)
+
+
+def format_payload(payload: Payload, indent: int) -> str:
+    """Format a payload as sexp."""
+    out: list[str] = []
+    write_payload(out, payload, indent)
+    return "".join(out)
 
 
 def format_entry(entry: Entry, indent: int) -> str:
     """Format an entry as sexp."""
-    prefix = "  " * indent
-    key_str = format_value(entry.key, indent + 1)
-    value_str = format_value(entry.value, indent + 1)
-    return f"{prefix}(entry\n{prefix}  {key_str}\n{prefix}  {value_str})"
+    out: list[str] = []
+    write_entry(out, entry, indent)
+    return "".join(out)
 
 
 def format_document(doc: Document) -> str:
     """Format a document as sexp."""
-    if not doc.entries:
-        return "(document [-1, -1]\n)"
-    entries_str = "\n".join(format_entry(entry, 1) for entry in doc.entries)
-    return f"(document [-1, -1]\n{entries_str}\n)"
+    out: list[str] = []
+    write_document(out, doc)
+    return "".join(out)
 
 
 def format_error(error: ParseError) -> str:
@@ -101,11 +164,15 @@ def format_error(error: ParseError) -> str:
     return f'(error [{error.span.start}, {error.span.end}] "parse error at {error.span.start}-{error.span.end}: {escaped_msg}")'
 
 
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES: Final[int] = 200
+
+
 def process_file(path: Path, corpus_root: Path) -> str:
     """Process a single styx file and return sexp output."""
     # Format: compliance/corpus/...
     relative = f"{corpus_root.parent.name}/{corpus_root.name}/{path.relative_to(corpus_root)}"
-    content = path.read_text()
+    content = path.read_bytes().decode("utf-8")
 
     try:
         parser = Parser(content)
@@ -115,6 +182,17 @@ def process_file(path: Path, corpus_root: Path) -> str:
         return f"; file: {relative}\n{format_error(e)}"
 
 
+def process_files(paths: list[Path], corpus_root: Path) -> Iterator[str]:
+    """Yield sexp output for styx files in order, using worker processes when worthwhile."""
+    worker = partial(process_file, corpus_root=corpus_root)
+    processes = os.cpu_count() or 1
+    if processes < 2 or len(paths) < PARALLEL_MIN_FILES:
+        yield from map(worker, paths)
+        return
+    with Pool(processes) as pool:
+        yield from pool.imap(worker, paths)
+
+
 def main() -> None:
     """Main entry point."""
     if len(sys.argv) < 2:
@@ -128,11 +206,11 @@ def main() -> None:
 
     styx_files = sorted(corpus_path.rglob("*.styx"))
 
-    results = []
-    for path in styx_files:
-        results.append(process_file(path, corpus_path))
-
-    print("\n".join(results))
+    # Write each file's output as soon as it's ready rather than holding it all
+    write = sys.stdout.write
+    for result in process_files(styx_files, corpus_path):
+        write(result)
+        write("\n")
 
 
 if __name__ == "__main__":
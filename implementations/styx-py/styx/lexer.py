@@ -3,29 +3,36 @@
 from __future__ import annotations
 
 import re
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum, auto
 from typing import Final
 
 from .types import ParseError, Span
 
 
-class TokenType(Enum):
+class TokenType(IntEnum):
     """Token types."""
 
-    SCALAR = "scalar"
-    QUOTED = "quoted"
-    RAW = "raw"
-    HEREDOC = "heredoc"
-    LBRACE = "lbrace"
-    RBRACE = "rbrace"
-    LPAREN = "lparen"
-    RPAREN = "rparen"
-    COMMA = "comma"
-    AT = "at"
-    TAG = "tag"
-    GT = "gt"
-    EOF = "eof"
+    SCALAR = auto()
+    QUOTED = auto()
+    RAW = auto()
+    HEREDOC = auto()
+    LBRACE = auto()
+    RBRACE = auto()
+    LPAREN = auto()
+    RPAREN = auto()
+    COMMA = auto()
+    AT = auto()
+    TAG = auto()
+    GT = auto()
+    EOF = auto()
+
+    @property
+    def label(self) -> str:
+        """Lowercase name used in error messages."""
+        return self.name.lower()
 
 
 @dataclass(slots=True)
@@ -39,316 +46,346 @@ class Token:
     had_newline_before: bool
 
 
+# Flag bits in TokenArrays.flags
+WHITESPACE_BEFORE: Final[int] = 1
+NEWLINE_BEFORE: Final[int] = 2
+
+
+@dataclass(slots=True)
+class TokenArrays:
+    """A whole token stream stored as parallel arrays, one entry per token."""
+
+    types: array[int]  # TokenType values
+    texts: list[str]
+    starts: array[int]  # span start, in bytes
+    ends: array[int]  # span end, in bytes
+    flags: array[int]  # WHITESPACE_BEFORE | NEWLINE_BEFORE
+    error: Exception | None  # lexer error after the last token, if any
+
+
+PUNCTUATION: Final[dict[str, TokenType]] = {
+    "{": TokenType.LBRACE,
+    "}": TokenType.RBRACE,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+    ",": TokenType.COMMA,
+    ">": TokenType.GT,
+}
+
 SPECIAL_CHARS: Final[frozenset[str]] = frozenset(
     ["{", "}", "(", ")", ",", '"', ">", " ", "\t", "\n", "\r"]
 )
 
-TAG_START_RE: Final[re.Pattern[str]] = re.compile(r"[A-Za-z_]")
-TAG_CHAR_RE: Final[re.Pattern[str]] = re.compile(r"[A-Za-z0-9_\-]")
+# Matches a (possibly empty) run of characters not in SPECIAL_CHARS
+BARE_SCALAR_RE: Final[re.Pattern[str]] = re.compile(r'[^{}(),"> \t\n\r]*')
+
+# Whitespace and line comments between tokens; comments never include the newline
+TRIVIA_RE: Final[re.Pattern[str]] = re.compile(r"(?:[ \t\r\n]+|//[^\n]*)*")
+
+# Characters that end a run of literal text inside a quoted string
+QUOTED_SPECIAL_RE: Final[re.Pattern[str]] = re.compile(r'["\\\n\r]')
+
+NON_ASCII_RE: Final[re.Pattern[str]] = re.compile(r"[^\x00-\x7f]")
+
+TAG_NAME_RE: Final[re.Pattern[str]] = re.compile(r"[A-Za-z_][A-Za-z0-9_\-]*")
 
 
 class Lexer:
     """Tokenizer for Styx source code."""
 
-    __slots__ = ("byte_pos", "pos", "source")
+    __slots__ = ("extra_bytes", "pos", "source", "wide_ends")
 
     def __init__(self, source: str) -> None:
         self.source = source
         self.pos = 0  # character position
-        self.byte_pos = 0  # byte position for spans
-
-    def _peek(self, offset: int = 0) -> str:
-        """Look ahead in the source."""
-        idx = self.pos + offset
-        if idx >= len(self.source):
-            return ""
-        return self.source[idx]
-
-    def _advance(self) -> str:
-        """Consume and return the next character."""
-        if self.pos >= len(self.source):
-            return ""
-        ch = self.source[self.pos]
-        self.pos += 1
-        self.byte_pos += len(ch.encode("utf-8"))
-        return ch
+        # Byte-offset index for spans: the character position just past each non-ASCII
+        # character, and the extra UTF-8 bytes accumulated up to each of them (with a
+        # leading 0). Both stay empty/trivial for ASCII sources.
+        self.wide_ends: list[int] = []
+        self.extra_bytes: list[int] = [0]
+        if not source.isascii():
+            extra = 0
+            for match in NON_ASCII_RE.finditer(source):
+                code = ord(match.group())
+                extra += 1 if code < 0x800 else 2 if code < 0x10000 else 3
+                self.wide_ends.append(match.end())
+                self.extra_bytes.append(extra)
+
+    @property
+    def byte_pos(self) -> int:
+        """Byte position of the current character, for spans."""
+        return self._byte_offset(self.pos)
+
+    def _byte_offset(self, pos: int) -> int:
+        """Convert a character position to a byte position."""
+        if not self.wide_ends:
+            return pos
+        return pos + self.extra_bytes[bisect_right(self.wide_ends, pos)]
 
     def _skip_whitespace_and_comments(self) -> tuple[bool, bool]:
         """Skip whitespace and comments, return (had_whitespace, had_newline)."""
-        had_whitespace = False
-        had_newline = False
-
-        while self.pos < len(self.source):
-            ch = self._peek()
-            if ch in (" ", "\t", "\r"):
-                had_whitespace = True
-                self._advance()
-            elif ch == "\n":
-                had_whitespace = True
-                had_newline = True
-                self._advance()
-            elif ch == "/" and self._peek(1) == "/":
-                had_whitespace = True
-                while self.pos < len(self.source) and self._peek() != "\n":
-                    self._advance()
-            else:
-                break
+        match = TRIVIA_RE.match(self.source, self.pos)
+        assert match is not None  # the pattern matches the empty string
+        skipped = match.group()
+        if not skipped:
+            return False, False
 
-        return had_whitespace, had_newline
-
-    def _is_tag_start(self, ch: str) -> bool:
-        """Check if character can start a tag name."""
-        return bool(TAG_START_RE.match(ch))
-
-    def _is_tag_char(self, ch: str) -> bool:
-        """Check if character can be in a tag name."""
-        return bool(TAG_CHAR_RE.match(ch))
+        self.pos = match.end()
+        return True, "\n" in skipped
 
     def next_token(self) -> Token:
         """Return the next token."""
         had_whitespace, had_newline = self._skip_whitespace_and_comments()
+        start = self.byte_pos
+        token_type, text = self._scan_token()
+        return Token(token_type, text, Span(start, self.byte_pos), had_whitespace, had_newline)
+
+    def tokenize_all(self) -> TokenArrays:
+        """Tokenize the rest of the source into parallel arrays, up to and including EOF.
+
+        A lexer error does not propagate: it is stored in ``error`` and the arrays end
+        just before the token that failed.
+        """
+        types: array[int] = array("B")
+        texts: list[str] = []
+        starts: array[int] = array("q")
+        ends: array[int] = array("q")
+        flags: array[int] = array("B")
+        error: Exception | None = None
+
+        # Positions only move forward, so instead of bisecting for every offset keep a
+        # cursor into the non-ASCII index: the count of wide characters before `pos`.
+        wide_ends = self.wide_ends
+        extra_bytes = self.extra_bytes
+        wide_count = len(wide_ends)
+        wide = 0
+
+        try:
+            while True:
+                had_whitespace, had_newline = self._skip_whitespace_and_comments()
+                start = self.pos
+                token_type, text = self._scan_token()
+                end = self.pos
+                types.append(token_type)
+                texts.append(text)
+                while wide < wide_count and wide_ends[wide] <= start:
+                    wide += 1
+                starts.append(start + extra_bytes[wide])
+                while wide < wide_count and wide_ends[wide] <= end:
+                    wide += 1
+                ends.append(end + extra_bytes[wide])
+                flags.append(
+                    (WHITESPACE_BEFORE if had_whitespace else 0)
+                    | (NEWLINE_BEFORE if had_newline else 0)
+                )
+                if token_type == TokenType.EOF:
+                    break
+        except (ParseError, ValueError, OverflowError) as e:
+            # A malformed \u escape raises ValueError or OverflowError from int() or chr();
+            # it is held back like a ParseError so that earlier syntax errors still win
+            error = e
 
-        if self.pos >= len(self.source):
-            return Token(
-                type=TokenType.EOF,
-                text="",
-                span=Span(self.byte_pos, self.byte_pos),
-                had_whitespace_before=had_whitespace,
-                had_newline_before=had_newline,
-            )
+        return TokenArrays(types, texts, starts, ends, flags, error)
 
-        start = self.byte_pos
-        ch = self._peek()
+    def _scan_token(self) -> tuple[TokenType, str]:
+        """Consume the token at the current position and return its type and text."""
+        source = self.source
+        n = len(source)
+        pos = self.pos
+
+        if pos >= n:
+            return TokenType.EOF, ""
+
+        ch = source[pos]
 
         # Single-character tokens
-        match ch:
-            case "{":
-                self._advance()
-                return Token(
-                    TokenType.LBRACE, "{", Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            case "}":
-                self._advance()
-                return Token(
-                    TokenType.RBRACE, "}", Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            case "(":
-                self._advance()
-                return Token(
-                    TokenType.LPAREN, "(", Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            case ")":
-                self._advance()
-                return Token(
-                    TokenType.RPAREN, ")", Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            case ",":
-                self._advance()
-                return Token(
-                    TokenType.COMMA, ",", Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            case ">":
-                self._advance()
-                return Token(
-                    TokenType.GT, ">", Span(start, self.byte_pos), had_whitespace, had_newline
-                )
+        token_type = PUNCTUATION.get(ch)
+        if token_type is not None:
+            self.pos = pos + 1
+            return token_type, ch
 
         # @ - either unit or tag
         if ch == "@":
-            self._advance()
-            if self._is_tag_start(self._peek()):
-                name_start = self.pos
-                while self._is_tag_char(self._peek()):
-                    self._advance()
-                name = self.source[name_start : self.pos]
-                return Token(
-                    TokenType.TAG, name, Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            return Token(TokenType.AT, "@", Span(start, self.byte_pos), had_whitespace, had_newline)
+            tag_match = TAG_NAME_RE.match(source, pos + 1)
+            if tag_match:
+                self.pos = tag_match.end()
+                return TokenType.TAG, tag_match.group()
+            self.pos = pos + 1
+            return TokenType.AT, "@"
 
         # Quoted string
         if ch == '"':
-            return self._read_quoted_string(start, had_whitespace, had_newline)
+            return TokenType.QUOTED, self._read_quoted_string()
 
         # Raw string
-        if ch == "r" and self._peek(1) in ('"', "#"):
-            return self._read_raw_string(start, had_whitespace, had_newline)
+        if ch == "r" and source.startswith(('"', "#"), pos + 1):
+            return TokenType.RAW, self._read_raw_string()
 
         # Heredoc - only if << is followed by uppercase letter
-        if ch == "<" and self._peek(1) == "<":
-            after_lt_lt = self._peek(2)
-            if after_lt_lt.isupper():
-                return self._read_heredoc(start, had_whitespace, had_newline)
+        if ch == "<" and source.startswith("<", pos + 1):
+            if source[pos + 2 : pos + 3].isupper():
+                return TokenType.HEREDOC, self._read_heredoc()
             # << not followed by uppercase - return error at just <<
-            self._advance()  # <
-            self._advance()  # <
-            error_end = self.byte_pos
+            start = self.byte_pos
             # Skip rest of line for recovery
-            while self.pos < len(self.source) and self._peek() != "\n":
-                self._advance()
-            raise ParseError("unexpected token", Span(start, error_end))
+            line_end = source.find("\n", pos)
+            self.pos = line_end if line_end >= 0 else n
+            raise ParseError("unexpected token", Span(start, start + 2))
 
         # Bare scalar
-        return self._read_bare_scalar(start, had_whitespace, had_newline)
+        return TokenType.SCALAR, self._read_bare_scalar()
 
-    def _read_quoted_string(self, start: int, had_whitespace: bool, had_newline: bool) -> Token:
+    def _read_quoted_string(self) -> str:
         """Read a quoted string."""
-        self._advance()  # opening "
-        text = ""
-
-        while self.pos < len(self.source):
-            ch = self._peek()
+        start = self.byte_pos
+        source = self.source
+        n = len(source)
+        pos = self.pos + 1  # opening "
+        parts: list[str] = []
+
+        while pos < n:
+            # Copy everything up to the next quote, backslash or newline in one go
+            special = QUOTED_SPECIAL_RE.search(source, pos)
+            run_end = special.start() if special else n
+            if run_end > pos:
+                parts.append(source[pos:run_end])
+                pos = run_end
+                continue
+
+            ch = source[pos]
             if ch == '"':
-                self._advance()
-                return Token(
-                    TokenType.QUOTED, text, Span(start, self.byte_pos), had_whitespace, had_newline
-                )
+                self.pos = pos + 1
+                return "".join(parts)
             if ch == "\\":
-                escape_start = self.byte_pos
-                self._advance()
-                escaped = self._advance()
+                escape_start = self._byte_offset(pos)
+                escaped = source[pos + 1 : pos + 2]
+                pos += 1 + len(escaped)
                 match escaped:
                     case "n":
-                        text += "\n"
+                        parts.append("\n")
                     case "r":
-                        text += "\r"
+                        parts.append("\r")
                     case "t":
-                        text += "\t"
+                        parts.append("\t")
                     case "\\":
-                        text += "\\"
+                        parts.append("\\")
                     case '"':
-                        text += '"'
+                        parts.append('"')
                     case "u":
-                        text += self._read_unicode_escape()
+                        self.pos = pos
+                        parts.append(self._read_unicode_escape())
+                        pos = self.pos
                     case _:
+                        self.pos = pos
                         raise ParseError(
                             f"invalid escape sequence: \\{escaped}",
                             Span(escape_start, self.byte_pos),
                         )
-            elif ch in ("\n", "\r"):
+            else:
                 # Unterminated string - include the newline in the span
-                self._advance()
-                if ch == "\r" and self._peek() == "\n":
-                    self._advance()
+                newline_len = 2 if ch == "\r" and source.startswith("\n", pos + 1) else 1
+                self.pos = pos + newline_len
                 raise ParseError("unexpected token", Span(start, self.byte_pos))
-            else:
-                text += self._advance()
 
         # EOF without closing quote - error
+        self.pos = pos
         raise ParseError("unexpected token", Span(start, self.byte_pos))
 
     def _read_unicode_escape(self) -> str:
         """Read a unicode escape sequence."""
-        if self._peek() == "{":
-            self._advance()
-            hex_str = ""
-            while self._peek() != "}" and self.pos < len(self.source):
-                hex_str += self._advance()
-            self._advance()
-            return chr(int(hex_str, 16))
+        source = self.source
+        n = len(source)
+        pos = self.pos
+        if source.startswith("{", pos):
+            end = source.find("}", pos + 1)
+            if end < 0:
+                end = n
+            hex_str = source[pos + 1 : end]
+            self.pos = min(end + 1, n)
         else:
-            hex_str = ""
-            for _ in range(4):
-                hex_str += self._advance()
-            return chr(int(hex_str, 16))
+            hex_str = source[pos : pos + 4]
+            self.pos = min(pos + 4, n)
+        return chr(int(hex_str, 16))
 
-    def _read_raw_string(self, start: int, had_whitespace: bool, had_newline: bool) -> Token:
+    def _read_raw_string(self) -> str:
         """Read a raw string."""
-        self._advance()  # r
+        start = self.byte_pos
+        source = self.source
+        n = len(source)
+        pos = self.pos + 1  # r
         hashes = 0
-        while self._peek() == "#":
-            self._advance()
+        while source.startswith("#", pos):
+            pos += 1
             hashes += 1
-        self._advance()  # opening "
+        pos = min(pos + 1, n)  # opening "
 
-        text = ""
+        # The body runs up to the first occurrence of the closing quote and hashes
         close_pattern = '"' + "#" * hashes
+        close_start = source.find(close_pattern, pos)
+        if close_start >= 0:
+            self.pos = close_start + len(close_pattern)
+            return source[pos:close_start]
 
-        while self.pos < len(self.source):
-            if self.source[self.pos : self.pos + len(close_pattern)] == close_pattern:
-                for _ in range(len(close_pattern)):
-                    self._advance()
-                return Token(
-                    TokenType.RAW, text, Span(start, self.byte_pos), had_whitespace, had_newline
-                )
-            text += self._advance()
-
+        self.pos = n
         raise ParseError("unclosed raw string", Span(start, self.byte_pos))
 
-    def _read_heredoc(self, start: int, had_whitespace: bool, had_newline: bool) -> Token:
+    def _read_heredoc(self) -> str:
         """Read a heredoc."""
-        self._advance()  # <
-        self._advance()  # <
+        source = self.source
+        n = len(source)
+        pos = self.pos + 2  # <<
 
-        delimiter = ""
-        while self.pos < len(self.source) and self._peek() != "\n":
-            delimiter += self._advance()
-        if self.pos < len(self.source):
-            self._advance()  # newline
+        line_end = source.find("\n", pos)
+        if line_end < 0:
+            line_end = n
+        delimiter = source[pos:line_end]
+        pos = min(line_end + 1, n)  # newline
 
         # Track content start (after the opening line)
+        self.pos = pos
         content_start = self.byte_pos
 
-        text = ""
+        parts: list[str] = []
         bare_delimiter = delimiter.split(",")[0]
 
-        while self.pos < len(self.source):
-            line = ""
-            while self.pos < len(self.source) and self._peek() != "\n":
-                line += self._advance()
+        while pos < n:
+            line_end = source.find("\n", pos)
+            if line_end < 0:
+                line_end = n
+            line = source[pos:line_end]
+            pos = line_end
 
             # Check for exact match (no indentation)
             if line == bare_delimiter:
-                return Token(
-                    TokenType.HEREDOC, text, Span(start, self.byte_pos), had_whitespace, had_newline
-                )
+                self.pos = pos
+                return "".join(parts)
 
             # Check for indented closing delimiter
             stripped = line.lstrip(" \t")
             if stripped == bare_delimiter:
+                self.pos = pos
                 indent_len = len(line) - len(stripped)
                 # Dedent the content by stripping up to indent_len from each line
-                result = self._dedent_heredoc(text, indent_len)
-                return Token(
-                    TokenType.HEREDOC,
-                    result,
-                    Span(start, self.byte_pos),
-                    had_whitespace,
-                    had_newline,
-                )
+                return self._dedent_heredoc("".join(parts), indent_len)
 
-            text += line
-            if self.pos < len(self.source) and self._peek() == "\n":
-                self._advance()
-                text += "\n"
+            parts.append(line)
+            if pos < n:
+                pos += 1
+                parts.append("\n")
 
         # EOF without closing delimiter - error points at the unmatched content
+        self.pos = pos
         raise ParseError("unexpected token", Span(content_start, self.byte_pos))
 
     def _dedent_heredoc(self, content: str, indent_len: int) -> str:
         """Strip up to indent_len whitespace characters from the start of each line."""
-        lines = content.split("\n")
-        result = []
-        for line in lines:
-            stripped = 0
-            for ch in line:
-                if stripped >= indent_len:
-                    break
-                if ch in (" ", "\t"):
-                    stripped += 1
-                else:
-                    break
-            result.append(line[stripped:])
-        return "\n".join(result)
+        # One substitution pass; re caches the compiled pattern per indent_len
+        return re.sub(rf"(?m)^[ \t]{{0,{indent_len}}}", "", content)
 
-    def _read_bare_scalar(self, start: int, had_whitespace: bool, had_newline: bool) -> Token:
+    def _read_bare_scalar(self) -> str:
         """Read a bare scalar."""
-        text = ""
-        while self.pos < len(self.source):
-            ch = self._peek()
-            if ch in SPECIAL_CHARS:
-                break
-            text += self._advance()
-        return Token(
-            TokenType.SCALAR, text, Span(start, self.byte_pos), had_whitespace, had_newline
-        )
+        match = BARE_SCALAR_RE.match(self.source, self.pos)
+        assert match is not None  # the pattern matches the empty string
+        text = match.group()
+        self.pos = match.end()
+        return text
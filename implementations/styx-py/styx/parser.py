@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from .lexer import Lexer, Token, TokenType
+from typing import TYPE_CHECKING, Final
+
+from .lexer import NEWLINE_BEFORE, WHITESPACE_BEFORE, Lexer, TokenType
 from .types import (
     Document,
     Entry,
@@ -17,6 +19,42 @@ from .types import (
     Value,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Token types used by the parser's checks, hoisted to module globals so hot paths skip
+# the enum attribute lookups, and prebuilt sets for checks against several types.
+_TT_SCALAR: Final = TokenType.SCALAR
+_TT_LBRACE: Final = TokenType.LBRACE
+_TT_RBRACE: Final = TokenType.RBRACE
+_TT_LPAREN: Final = TokenType.LPAREN
+_TT_RPAREN: Final = TokenType.RPAREN
+_TT_COMMA: Final = TokenType.COMMA
+_TT_AT: Final = TokenType.AT
+_TT_TAG: Final = TokenType.TAG
+_TT_GT: Final = TokenType.GT
+_TT_EOF: Final = TokenType.EOF
+
+# End of an object body (or the document)
+_BLOCK_END: Final = frozenset((TokenType.EOF, TokenType.RBRACE))
+# End of a sequence body
+_SEQUENCE_END: Final = frozenset((TokenType.EOF, TokenType.RPAREN))
+# End of an entry
+_ENTRY_END: Final = frozenset((TokenType.EOF, TokenType.RBRACE, TokenType.COMMA))
+# What may directly follow a bare tag
+_TAG_END: Final = frozenset((TokenType.EOF, TokenType.RBRACE, TokenType.RPAREN, TokenType.COMMA))
+# What may directly follow a unit @
+_UNIT_END: Final = _TAG_END | {TokenType.LBRACE, TokenType.LPAREN}
+# Scalar tokens that can be a tag payload
+_STRING_TOKENS: Final = frozenset((TokenType.QUOTED, TokenType.RAW, TokenType.HEREDOC))
+
+_SCALAR_KINDS: Final[dict[int, ScalarKind]] = {
+    TokenType.SCALAR: ScalarKind.BARE,
+    TokenType.QUOTED: ScalarKind.QUOTED,
+    TokenType.RAW: ScalarKind.RAW,
+    TokenType.HEREDOC: ScalarKind.HEREDOC,
+}
+
 
 class PathState:
     """Track path state for detecting reopen-path and nest-into-terminal errors."""
@@ -24,32 +62,45 @@ class PathState:
     __slots__ = ("assigned_paths", "closed_paths", "current_path")
 
     def __init__(self) -> None:
-        self.current_path: list[str] = []
-        self.closed_paths: set[str] = set()  # Paths that have had siblings
-        self.assigned_paths: dict[str, tuple[PathValueKind, Span]] = {}
+        self.current_path: tuple[str, ...] = ()
+        # Paths are keyed by their segments; dotted text is only built for error messages
+        self.closed_paths: set[tuple[str, ...]] = set()  # Paths that have had siblings
+        self.assigned_paths: dict[tuple[str, ...], tuple[PathValueKind, Span]] = {}
 
-    def check_and_update(self, path: list[str], span: Span, kind: PathValueKind) -> None:
+    def check_and_update(self, path: tuple[str, ...], span: Span, kind: PathValueKind) -> None:
         """Check path validity and update state. Raises ParseError if invalid."""
-        full_path = ".".join(path)
-
         # 1. Check for duplicate
-        if full_path in self.assigned_paths:
-            existing_kind, _existing_span = self.assigned_paths[full_path]
+        if path in self.assigned_paths:
+            existing_kind, _existing_span = self.assigned_paths[path]
             if existing_kind == PathValueKind.TERMINAL:
                 raise ParseError("duplicate key", span)
             # Both are objects - it's a reopen attempt
-            raise ParseError(f"cannot reopen path `{full_path}` after sibling appeared", span)
+            raise ParseError(f"cannot reopen path `{'.'.join(path)}` after sibling appeared", span)
+
+        # Fast path for single-segment keys: there are no prefixes to check or record,
+        # and nothing is shared with the current path (that would be a duplicate above)
+        if len(path) == 1:
+            current_path = self.current_path
+            for i in range(len(current_path)):
+                self.closed_paths.add(current_path[: i + 1])
+            self.assigned_paths[path] = (kind, span)
+            self.current_path = path
+            return
+
+        # Proper prefixes of the path: ("a",), ("a", "b") for a.b.c
+        prefixes = [path[:i] for i in range(1, len(path))]
 
         # 2. Check if any prefix is closed (has had siblings) or is terminal
-        for i in range(1, len(path)):
-            prefix = ".".join(path[:i])
+        for prefix in prefixes:
             if prefix in self.closed_paths:
-                raise ParseError(f"cannot reopen path `{prefix}` after sibling appeared", span)
+                raise ParseError(
+                    f"cannot reopen path `{'.'.join(prefix)}` after sibling appeared", span
+                )
             if prefix in self.assigned_paths:
                 prefix_kind, _prefix_span = self.assigned_paths[prefix]
                 if prefix_kind == PathValueKind.TERMINAL:
                     raise ParseError(
-                        f"cannot nest into `{prefix}` which has a terminal value", span
+                        f"cannot nest into `{'.'.join(prefix)}` which has a terminal value", span
                     )
 
         # 3. Find common prefix length with current path
@@ -62,269 +113,277 @@ class PathState:
 
         # 4. Close all divergent paths from current path
         for i in range(common_len, len(self.current_path)):
-            divergent = ".".join(self.current_path[: i + 1])
-            self.closed_paths.add(divergent)
+            self.closed_paths.add(self.current_path[: i + 1])
 
         # 5. Record intermediate segments as objects
-        for i in range(len(path) - 1):
-            prefix = ".".join(path[: i + 1])
-            if prefix not in self.assigned_paths:
-                self.assigned_paths[prefix] = (PathValueKind.OBJECT, span)
+        for prefix in prefixes:
+            self.assigned_paths.setdefault(prefix, (PathValueKind.OBJECT, span))
 
         # 6. Record the final path
-        self.assigned_paths[full_path] = (kind, span)
-        self.current_path = path.copy()
+        self.assigned_paths[path] = (kind, span)
+        self.current_path = path
 
 
 class Parser:
     """Parser for Styx documents."""
 
-    __slots__ = ("current", "lexer", "peeked", "source")
+    __slots__ = (
+        "ends",
+        "eof_index",
+        "error",
+        "error_index",
+        "flags",
+        "index",
+        "lexer",
+        "starts",
+        "texts",
+        "types",
+    )
 
     def __init__(self, source: str) -> None:
-        self.source = source
-        self.lexer = Lexer(source)
-        self.current = self.lexer.next_token()
-        self.peeked: Token | None = None
-
-    def _advance(self) -> Token:
-        """Consume and return the current token."""
-        prev = self.current
-        if self.peeked:
-            self.current = self.peeked
-            self.peeked = None
+        self.lexer = Lexer(source)  # kept for the source text, read on error paths only
+        tokens = self.lexer.tokenize_all()
+        self.types = tokens.types
+        self.texts = tokens.texts
+        self.starts = tokens.starts
+        self.ends = tokens.ends
+        self.flags = tokens.flags
+        # A lexer error is raised only once the parser reaches the token that failed,
+        # so errors earlier in the source are still reported first.
+        error = self.error = tokens.error
+        self.index = 0  # index of the current token
+        if error is None:
+            self.eof_index = len(tokens.types) - 1
+            self.error_index = -1
         else:
-            self.current = self.lexer.next_token()
+            self.eof_index = -1
+            self.error_index = len(tokens.types)
+            if not tokens.types:
+                raise error
+
+    def _peek(self) -> int:
+        """Look ahead one token, returning its index (EOF repeats)."""
+        index = self.index
+        if index == self.eof_index:
+            return index
+        index += 1
+        if index == self.error_index:
+            assert self.error is not None
+            raise self.error
+        return index
+
+    def _advance(self) -> int:
+        """Consume the current token and return its index."""
+        prev = self.index
+        if prev != self.eof_index:
+            if prev + 1 == self.error_index:
+                assert self.error is not None
+                raise self.error
+            self.index = prev + 1
         return prev
 
-    def _peek(self) -> Token:
-        """Look ahead one token."""
-        if not self.peeked:
-            self.peeked = self.lexer.next_token()
-        return self.peeked
-
-    def _check(self, *types: TokenType) -> bool:
-        """Check if current token matches any of the given types."""
-        return self.current.type in types
-
-    def _expect(self, token_type: TokenType) -> Token:
-        """Expect a specific token type."""
-        if self.current.type != token_type:
+    def _skip_commas(self) -> None:
+        """Consume a run of commas in one pass over the token types."""
+        types = self.types
+        index = self.index
+        while types[index] == _TT_COMMA:
+            index += 1
+            if index == self.error_index:
+                assert self.error is not None
+                raise self.error
+        self.index = index
+
+    def _span(self, index: int) -> Span:
+        """Build the span of the token at the given index."""
+        return Span(self.starts[index], self.ends[index])
+
+    def _expect(self, token_type: TokenType) -> int:
+        """Expect a specific token type, returning its index."""
+        if self.types[self.index] != token_type:
             raise ParseError(
-                f"expected {token_type.value}, got {self.current.type.value}",
-                self.current.span,
+                f"expected {token_type.label}, got {TokenType(self.types[self.index]).label}",
+                self._span(self.index),
             )
         return self._advance()
 
     def parse(self) -> Document:
         """Parse a complete document."""
         entries: list[Entry] = []
-        start = self.current.span.start
-        path_state = PathState()
+        start = self.starts[self.index]
 
         # Skip any leading commas
-        while self._check(TokenType.COMMA):
-            self._advance()
+        self._skip_commas()
 
         # Check for explicit root object: { ... } at document start
-        if self._check(TokenType.LBRACE):
+        if self.types[self.index] == _TT_LBRACE:
             # Explicit root object - parse it and check for trailing content
             obj = self._parse_object()
-            obj_value = Value(span=obj.span, payload=obj)
-            unit_key = Value(span=Span(-1, -1))
-            entries.append(Entry(key=unit_key, value=obj_value))
+            obj_value = Value(obj.span, None, obj)
+            unit_key = Value(Span(-1, -1))
+            entries.append(Entry(unit_key, obj_value))
 
             # After explicit root object, only whitespace/comments/EOF are allowed
             # Skip commas (they don't count as "content")
-            while self._check(TokenType.COMMA):
-                self._advance()
+            self._skip_commas()
 
-            if not self._check(TokenType.EOF):
+            if self.types[self.index] != _TT_EOF:
                 # Find the span of trailing content
-                trailing_start = self.current.span.start
+                trailing_start = self.starts[self.index]
                 # Consume tokens to find the end of all trailing content
                 # Use EOF token's start as end (which includes trailing whitespace/newlines)
-                while not self._check(TokenType.EOF):
+                while self.types[self.index] != _TT_EOF:
                     self._advance()
-                trailing_end = self.current.span.start
+                trailing_end = self.starts[self.index]
                 raise ParseError(
                     "trailing content after explicit root object",
                     Span(trailing_start, trailing_end),
                 )
 
-            return Document(
-                entries=entries,
-                span=Span(start, self.current.span.end),
-            )
+            return Document(entries, Span(start, self.ends[self.index]))
+
+        # Document-level keys go through path state checking (an explicit root object
+        # returned above never needs one)
+        path_state = PathState()
+
+        def expand_dotted(path_text: str, span: Span) -> Entry:
+            return self._expand_dotted_path_with_state(path_text, span, path_state)
 
-        while not self._check(TokenType.EOF):
-            entry = self._parse_entry_with_path_check(path_state)
+        def record_key(key_text: str, span: Span, kind: PathValueKind) -> None:
+            path_state.check_and_update((key_text,), span, kind)
+
+        while self.types[self.index] != _TT_EOF:
+            entry = self._parse_entry(expand_dotted, record_key=record_key)
             if entry:
                 entries.append(entry)
 
-        return Document(
-            entries=entries,
-            span=Span(start, self.current.span.end),
-        )
+        return Document(entries, Span(start, self.ends[self.index]))
 
-    def _parse_entry_with_path_check(self, path_state: PathState) -> Entry | None:
-        """Parse an entry at document level with path state checking."""
-        while self._check(TokenType.COMMA):
-            self._advance()
+    def _parse_entry(
+        self,
+        expand_dotted: Callable[[str, Span], Entry],
+        check_key: Callable[[str, Span], None] | None = None,
+        record_key: Callable[[str, Span, PathValueKind], None] | None = None,
+    ) -> Entry | None:
+        """Parse an entry, leaving key bookkeeping to the caller's policy.
+
+        ``expand_dotted`` expands a dotted bare key into nested objects, ``check_key``
+        sees a plain key before its value is parsed and ``record_key`` after, along with
+        the kind of value it was given.
+        """
+        self._skip_commas()
 
         # Stray > tokens without a value are an error
-        if self._check(TokenType.GT):
-            raise ParseError("expected a value", self.current.span)
+        if self.types[self.index] == _TT_GT:
+            raise ParseError("expected a value", self._span(self.index))
 
-        if self._check(TokenType.EOF, TokenType.RBRACE):
+        if self.types[self.index] in _BLOCK_END:
             return None
 
         key = self._parse_value()
+        key_payload = key.payload
 
         # Special case: object in key position gets implicit unit key
-        if key.payload is not None and isinstance(key.payload, StyxObject):
-            if not self.current.had_newline_before and not self._check(
-                TokenType.EOF, TokenType.RBRACE, TokenType.COMMA
+        # (isinstance is False for None, and cheap for these exact classes)
+        if isinstance(key_payload, StyxObject):
+            if (
+                not self.flags[self.index] & NEWLINE_BEFORE
+                and self.types[self.index] not in _ENTRY_END
             ):
                 self._parse_value()  # Drop trailing value
-            unit_key = Value(span=Span(-1, -1))
-            return Entry(key=unit_key, value=key)
+            unit_key = Value(Span(-1, -1))
+            return Entry(unit_key, key)
 
         # Check for dotted path in bare scalar key
-        if (
-            key.payload is not None
-            and isinstance(key.payload, Scalar)
-            and key.payload.kind == ScalarKind.BARE
-        ):
-            text = key.payload.text
+        if isinstance(key_payload, Scalar) and key_payload.kind == ScalarKind.BARE:
+            text = key_payload.text
             if "." in text:
-                return self._expand_dotted_path_with_state(text, key.span, path_state)
+                return expand_dotted(text, key.span)
 
-        # Check key validity with path state
         key_text = self._get_key_text(key)
+        if key_text is not None and check_key is not None:
+            check_key(key_text, key.span)
 
         self._validate_key(key)
 
         # Check for implicit unit
-        if self.current.had_newline_before or self._check(TokenType.EOF, TokenType.RBRACE):
-            if key_text is not None:
-                path_state.check_and_update([key_text], key.span, PathValueKind.TERMINAL)
-            return Entry(key=key, value=Value(span=key.span))
+        if self.flags[self.index] & NEWLINE_BEFORE or self.types[self.index] in _BLOCK_END:
+            if key_text is not None and record_key is not None:
+                record_key(key_text, key.span, PathValueKind.TERMINAL)
+            return Entry(key, Value(key.span))
 
         value = self._parse_value()
 
         # Determine kind from actual value
-        if key_text is not None:
-            if value.payload is not None and isinstance(value.payload, StyxObject):
+        if key_text is not None and record_key is not None:
+            if isinstance(value.payload, StyxObject):
                 kind = PathValueKind.OBJECT
             else:
                 kind = PathValueKind.TERMINAL
-            path_state.check_and_update([key_text], key.span, kind)
-
-        return Entry(key=key, value=value)
-
-    def _parse_entry_with_dup_check(self, seen_keys: dict[str, Span]) -> Entry | None:
-        """Parse an entry with duplicate key checking."""
-        while self._check(TokenType.COMMA):
-            self._advance()
-
-        # Stray > tokens without a value are an error
-        if self._check(TokenType.GT):
-            raise ParseError("expected a value", self.current.span)
-
-        if self._check(TokenType.EOF, TokenType.RBRACE):
-            return None
-
-        key = self._parse_value()
-
-        # Special case: object in key position gets implicit unit key
-        if key.payload is not None and isinstance(key.payload, StyxObject):
-            if not self.current.had_newline_before and not self._check(
-                TokenType.EOF, TokenType.RBRACE, TokenType.COMMA
-            ):
-                self._parse_value()  # Drop trailing value
-            unit_key = Value(span=Span(-1, -1))
-            return Entry(key=unit_key, value=key)
-
-        # Check for dotted path in bare scalar key
-        if (
-            key.payload is not None
-            and isinstance(key.payload, Scalar)
-            and key.payload.kind == ScalarKind.BARE
-        ):
-            text = key.payload.text
-            if "." in text:
-                return self._expand_dotted_path(text, key.span, seen_keys)
-
-        # Check for duplicate key
-        key_text = self._get_key_text(key)
-        if key_text is not None:
-            if key_text in seen_keys:
-                raise ParseError("duplicate key", key.span)
-            seen_keys[key_text] = key.span
-
-        self._validate_key(key)
+            record_key(key_text, key.span, kind)
 
-        # Check for implicit unit
-        if self.current.had_newline_before or self._check(TokenType.EOF, TokenType.RBRACE):
-            return Entry(key=key, value=Value(span=key.span))
-
-        value = self._parse_value()
-        return Entry(key=key, value=value)
+        return Entry(key, value)
 
     def _get_key_text(self, key: Value) -> str | None:
         """Get the text representation of a key for duplicate checking."""
-        if key.payload is not None and isinstance(key.payload, Scalar):
-            return key.payload.text
-        if key.tag is not None and key.payload is None:
+        payload = key.payload
+        if isinstance(payload, Scalar):
+            return payload.text
+        if key.tag is not None and payload is None:
             return f"@{key.tag.name}"
         return None
 
     def _validate_key(self, key: Value) -> None:
         """Validate that a value can be used as a key."""
-        if key.payload is not None:
-            if isinstance(key.payload, Sequence):
-                raise ParseError("invalid key", key.span)
-            if isinstance(key.payload, Scalar) and key.payload.kind == ScalarKind.HEREDOC:
-                # Point at just the opening marker (<<TAG), not the whole content
-                error_span = self._heredoc_start_span(key.payload.span)
-                raise ParseError("invalid key", error_span)
+        payload = key.payload
+        if isinstance(payload, Sequence):
+            raise ParseError("invalid key", key.span)
+        if isinstance(payload, Scalar) and payload.kind == ScalarKind.HEREDOC:
+            # Point at just the opening marker (<<TAG), not the whole content
+            error_span = self._heredoc_start_span(payload.span)
+            raise ParseError("invalid key", error_span)
 
     def _heredoc_start_span(self, heredoc_span: Span) -> Span:
         """Get the span of just the heredoc opening marker (<<TAG\\n)."""
-        text = self.source[heredoc_span.start : heredoc_span.end]
+        text = self.lexer.source[heredoc_span.start : heredoc_span.end]
         newline_idx = text.find("\n")
         end_offset = newline_idx + 1 if newline_idx >= 0 else len(text)
         return Span(heredoc_span.start, heredoc_span.start + end_offset)
 
+    def _segment_spans(self, path_text: str, segments: list[str], start: int) -> list[Span]:
+        """Get the span of each segment of a dotted path starting at byte offset start."""
+        # Bare keys are nearly always ASCII, where byte lengths are just string lengths
+        ascii_only = path_text.isascii()
+        segment_spans: list[Span] = []
+        offset = start
+        for segment in segments:
+            segment_bytes = len(segment) if ascii_only else len(segment.encode("utf-8"))
+            segment_spans.append(Span(offset, offset + segment_bytes))
+            offset += segment_bytes + 1  # +1 for the dot
+        return segment_spans
+
     def _expand_dotted_path_with_state(
         self, path_text: str, span: Span, path_state: PathState
     ) -> Entry:
         """Expand a dotted path into nested objects with path state validation."""
-        segments = path_text.split(".")
-
-        if any(s == "" for s in segments):
+        # An empty segment means a leading, trailing or doubled dot
+        if path_text.startswith(".") or path_text.endswith(".") or ".." in path_text:
             raise ParseError("invalid key", span)
 
-        # Calculate spans for each segment
-        segment_spans: list[Span] = []
-        offset = span.start
-        for segment in segments:
-            segment_bytes = len(segment.encode("utf-8"))
-            segment_spans.append(Span(offset, offset + segment_bytes))
-            offset += segment_bytes + 1  # +1 for the dot
+        segments = path_text.split(".")
+
+        segment_spans = self._segment_spans(path_text, segments, span.start)
 
         # Parse the value
         value = self._parse_value()
 
         # Determine value kind
-        if value.payload is not None and isinstance(value.payload, StyxObject):
+        if isinstance(value.payload, StyxObject):
             kind = PathValueKind.OBJECT
         else:
             kind = PathValueKind.TERMINAL
 
         # Check and update path state - use full path span for error messages
-        path_state.check_and_update(segments, span, kind)
+        path_state.check_and_update(tuple(segments), span, kind)
 
         # Build nested objects from inside out
         # Object spans start at the PREVIOUS segment's position (i-1)
@@ -332,284 +391,237 @@ class Parser:
         result = value
         for i in range(len(segments) - 1, 0, -1):
             seg_span = segment_spans[i]
-            segment_key = Value(
-                span=seg_span,
-                payload=Scalar(text=segments[i], kind=ScalarKind.BARE, span=seg_span),
-            )
+            segment_key = Value(seg_span, None, Scalar(segments[i], ScalarKind.BARE, seg_span))
             # Object span starts at the previous segment's position
             obj_start = segment_spans[i - 1].start
             obj_span = Span(obj_start, last_key_end)
-            result = Value(
-                span=obj_span,
-                payload=StyxObject(
-                    entries=[Entry(key=segment_key, value=result)],
-                    span=obj_span,
-                ),
-            )
+            result = Value(obj_span, None, StyxObject([Entry(segment_key, result)], obj_span))
 
         first_span = segment_spans[0]
-        outer_key = Value(
-            span=first_span,
-            payload=Scalar(text=segments[0], kind=ScalarKind.BARE, span=first_span),
-        )
+        outer_key = Value(first_span, None, Scalar(segments[0], ScalarKind.BARE, first_span))
 
-        return Entry(key=outer_key, value=result)
+        return Entry(outer_key, result)
 
     def _expand_dotted_path(self, path_text: str, span: Span, seen_keys: dict[str, Span]) -> Entry:
         """Expand a dotted path into nested objects."""
-        segments = path_text.split(".")
-
-        if any(s == "" for s in segments):
+        # An empty segment means a leading, trailing or doubled dot
+        if path_text.startswith(".") or path_text.endswith(".") or ".." in path_text:
             raise ParseError("invalid key", span)
 
+        segments = path_text.split(".")
+
         first_segment = segments[0]
         if first_segment in seen_keys:
             raise ParseError("duplicate key", span)
         seen_keys[first_segment] = span
 
-        segment_spans: list[Span] = []
-        offset = span.start
-        for segment in segments:
-            segment_bytes = len(segment.encode("utf-8"))
-            segment_spans.append(Span(offset, offset + segment_bytes))
-            offset += segment_bytes + 1
+        segment_spans = self._segment_spans(path_text, segments, span.start)
 
         value = self._parse_value()
 
         result = value
         for i in range(len(segments) - 1, 0, -1):
             seg_span = segment_spans[i]
-            segment_key = Value(
-                span=seg_span,
-                payload=Scalar(text=segments[i], kind=ScalarKind.BARE, span=seg_span),
-            )
-            result = Value(
-                span=span,
-                payload=StyxObject(
-                    entries=[Entry(key=segment_key, value=result)],
-                    span=span,
-                ),
-            )
+            segment_key = Value(seg_span, None, Scalar(segments[i], ScalarKind.BARE, seg_span))
+            result = Value(span, None, StyxObject([Entry(segment_key, result)], span))
 
         first_span = segment_spans[0]
-        outer_key = Value(
-            span=first_span,
-            payload=Scalar(text=first_segment, kind=ScalarKind.BARE, span=first_span),
-        )
+        outer_key = Value(first_span, None, Scalar(first_segment, ScalarKind.BARE, first_span))
 
-        return Entry(key=outer_key, value=result)
+        return Entry(outer_key, result)
 
     def _parse_attribute_value(self) -> Value:
         """Parse a value in attribute context."""
-        if self._check(TokenType.LBRACE):
+        if self.types[self.index] == _TT_LBRACE:
             obj = self._parse_object()
-            return Value(span=obj.span, payload=obj)
-        if self._check(TokenType.LPAREN):
+            return Value(obj.span, None, obj)
+        if self.types[self.index] == _TT_LPAREN:
             seq = self._parse_sequence()
-            return Value(span=seq.span, payload=seq)
-        if self._check(TokenType.TAG):
+            return Value(seq.span, None, seq)
+        if self.types[self.index] == _TT_TAG:
             return self._parse_tag_value()
-        if self._check(TokenType.AT):
-            at_token = self._advance()
-            return Value(span=at_token.span)
+        if self.types[self.index] == _TT_AT:
+            at_index = self._advance()
+            return Value(self._span(at_index))
         scalar = self._parse_scalar()
-        return Value(span=scalar.span, payload=scalar)
+        return Value(scalar.span, None, scalar)
 
     def _parse_tag_value(self) -> Value:
         """Parse a tag with optional payload."""
-        start = self.current.span.start
-        tag_token = self._advance()
-        tag = Tag(name=tag_token.text, span=tag_token.span)
+        start = self.starts[self.index]
+        tag_index = self._advance()
+        tag_span = self._span(tag_index)
+        tag = Tag(self.texts[tag_index], tag_span)
 
-        if not self.current.had_whitespace_before:
-            if self._check(TokenType.LBRACE):
+        if not self.flags[self.index] & WHITESPACE_BEFORE:
+            if self.types[self.index] == _TT_LBRACE:
                 obj = self._parse_object()
-                return Value(span=obj.span, tag=tag, payload=obj)
-            if self._check(TokenType.LPAREN):
+                return Value(obj.span, tag, obj)
+            if self.types[self.index] == _TT_LPAREN:
                 seq = self._parse_sequence()
-                return Value(span=seq.span, tag=tag, payload=seq)
-            if self._check(TokenType.QUOTED, TokenType.RAW, TokenType.HEREDOC):
+                return Value(seq.span, tag, seq)
+            if self.types[self.index] in _STRING_TOKENS:
                 scalar = self._parse_scalar()
-                return Value(span=scalar.span, tag=tag, payload=scalar)
-            if self._check(TokenType.AT):
-                at_token = self._advance()
-                return Value(span=at_token.span, tag=tag)
+                return Value(scalar.span, tag, scalar)
+            if self.types[self.index] == _TT_AT:
+                at_index = self._advance()
+                return Value(self._span(at_index), tag)
             # If there's something else immediately after the tag (like /package),
             # it's an invalid tag name. Span starts at the @.
-            if not self._check(
-                TokenType.EOF,
-                TokenType.RBRACE,
-                TokenType.RPAREN,
-                TokenType.COMMA,
-            ):
-                raise ParseError("invalid tag name", Span(start, self.current.span.end))
+            if self.types[self.index] not in _TAG_END:
+                raise ParseError("invalid tag name", Span(start, self.ends[self.index]))
 
-        return Value(span=Span(start, tag_token.span.end), tag=tag)
+        return Value(Span(start, tag_span.end), tag)
 
     def _parse_value(self) -> Value:
         """Parse a value."""
-        if self._check(TokenType.AT):
-            at_token = self._advance()
-            if not self.current.had_whitespace_before and not self._check(
-                TokenType.EOF,
-                TokenType.RBRACE,
-                TokenType.RPAREN,
-                TokenType.COMMA,
-                TokenType.LBRACE,
-                TokenType.LPAREN,
+        if self.types[self.index] == _TT_AT:
+            at_index = self._advance()
+            if (
+                not self.flags[self.index] & WHITESPACE_BEFORE
+                and self.types[self.index] not in _UNIT_END
             ):
                 # Error span includes the @ (it's part of the tag)
                 raise ParseError(
-                    "invalid tag name", Span(at_token.span.start, self.current.span.end)
+                    "invalid tag name", Span(self.starts[at_index], self.ends[self.index])
                 )
-            return Value(span=Span(at_token.span.start, at_token.span.end))
+            return Value(self._span(at_index))
 
-        if self._check(TokenType.TAG):
+        if self.types[self.index] == _TT_TAG:
             return self._parse_tag_value()
 
-        if self._check(TokenType.LBRACE):
+        if self.types[self.index] == _TT_LBRACE:
             obj = self._parse_object()
-            return Value(span=obj.span, payload=obj)
+            return Value(obj.span, None, obj)
 
-        if self._check(TokenType.LPAREN):
+        if self.types[self.index] == _TT_LPAREN:
             seq = self._parse_sequence()
-            return Value(span=seq.span, payload=seq)
+            return Value(seq.span, None, seq)
 
-        if self._check(TokenType.SCALAR):
-            scalar_token = self._advance()
-            next_token = self.current
+        if self.types[self.index] == _TT_SCALAR:
+            scalar_index = self._advance()
 
             # Attribute syntax: scalar>value - but only if there's actually a value after >
             # If > is at EOF or followed by newline, just treat scalar as the value
-            if (
-                next_token.type == TokenType.GT
-                and not next_token.had_whitespace_before
-                and not self._peek().had_newline_before
-                and self._peek().type != TokenType.EOF
-            ):
-                return self._parse_attributes_starting_with(scalar_token)
+            if self.types[self.index] == _TT_GT and not self.flags[self.index] & WHITESPACE_BEFORE:
+                after_gt = self._peek()
+                if not self.flags[after_gt] & NEWLINE_BEFORE and self.types[after_gt] != _TT_EOF:
+                    return self._parse_attributes_starting_with(scalar_index)
 
+            scalar_span = self._span(scalar_index)
             return Value(
-                span=scalar_token.span,
-                payload=Scalar(
-                    text=scalar_token.text,
-                    kind=ScalarKind.BARE,
-                    span=scalar_token.span,
-                ),
+                scalar_span, None, Scalar(self.texts[scalar_index], ScalarKind.BARE, scalar_span)
             )
 
         scalar = self._parse_scalar()
-        return Value(span=scalar.span, payload=scalar)
+        return Value(scalar.span, None, scalar)
 
-    def _parse_attributes_starting_with(self, first_key_token: Token) -> Value:
+    def _parse_attributes_starting_with(self, first_key_index: int) -> Value:
         """Parse attribute syntax (key>value key>value ...)."""
         attrs: list[Entry] = []
-        start_span = first_key_token.span
+        start_span = self._span(first_key_index)
 
-        self._expect(TokenType.GT)
+        self._expect(_TT_GT)
         first_key = Value(
-            span=first_key_token.span,
-            payload=Scalar(
-                text=first_key_token.text,
-                kind=ScalarKind.BARE,
-                span=first_key_token.span,
-            ),
+            start_span, None, Scalar(self.texts[first_key_index], ScalarKind.BARE, start_span)
         )
         first_value = self._parse_attribute_value()
-        attrs.append(Entry(key=first_key, value=first_value))
+        attrs.append(Entry(first_key, first_value))
 
         end_span = first_value.span
+        types = self.types
+        flags = self.flags
 
-        while self._check(TokenType.SCALAR) and not self.current.had_newline_before:
-            key_token = self.current
-            next_token = self._peek()
-            if next_token.type != TokenType.GT or next_token.had_whitespace_before:
+        while types[self.index] == _TT_SCALAR and not flags[self.index] & NEWLINE_BEFORE:
+            key_index = self.index
+            next_index = self._peek()
+            if types[next_index] != _TT_GT or flags[next_index] & WHITESPACE_BEFORE:
                 break
 
-            self._advance()
+            # Move straight onto the `>` we just peeked at, then consume it
+            self.index = next_index
             self._advance()
 
+            key_span = self._span(key_index)
             attr_key = Value(
-                span=key_token.span,
-                payload=Scalar(
-                    text=key_token.text,
-                    kind=ScalarKind.BARE,
-                    span=key_token.span,
-                ),
+                key_span, None, Scalar(self.texts[key_index], ScalarKind.BARE, key_span)
             )
 
             attr_value = self._parse_attribute_value()
-            attrs.append(Entry(key=attr_key, value=attr_value))
+            attrs.append(Entry(attr_key, attr_value))
             end_span = attr_value.span
 
-        obj = StyxObject(
-            entries=attrs,
-            span=Span(start_span.start, end_span.end),
-        )
+        obj = StyxObject(attrs, Span(start_span.start, end_span.end))
 
-        return Value(span=obj.span, payload=obj)
+        return Value(obj.span, None, obj)
 
     def _parse_scalar(self) -> Scalar:
         """Parse a scalar value."""
-        token = self.current
-
-        match token.type:
-            case TokenType.SCALAR:
-                kind = ScalarKind.BARE
-            case TokenType.QUOTED:
-                kind = ScalarKind.QUOTED
-            case TokenType.RAW:
-                kind = ScalarKind.RAW
-            case TokenType.HEREDOC:
-                kind = ScalarKind.HEREDOC
-            case _:
-                raise ParseError(f"expected scalar, got {token.type.value}", token.span)
+        index = self.index
+
+        kind = _SCALAR_KINDS.get(self.types[index])
+        if kind is None:
+            raise ParseError(
+                f"expected scalar, got {TokenType(self.types[index]).label}",
+                self._span(index),
+            )
 
         self._advance()
-        return Scalar(text=token.text, kind=kind, span=token.span)
+        return Scalar(self.texts[index], kind, self._span(index))
 
     def _parse_object(self) -> StyxObject:
         """Parse an object."""
-        open_brace = self._expect(TokenType.LBRACE)
-        start = open_brace.span.start
+        open_brace = self._expect(_TT_LBRACE)
+        start = self.starts[open_brace]
         entries: list[Entry] = []
         seen_keys: dict[str, Span] = {}
+        types = self.types
+
+        # Keys in an object only need duplicate checking
+        def expand_dotted(path_text: str, span: Span) -> Entry:
+            return self._expand_dotted_path(path_text, span, seen_keys)
+
+        def check_key(key_text: str, span: Span) -> None:
+            if key_text in seen_keys:
+                raise ParseError("duplicate key", span)
+            seen_keys[key_text] = span
 
-        while not self._check(TokenType.RBRACE, TokenType.EOF):
-            entry = self._parse_entry_with_dup_check(seen_keys)
+        while types[self.index] not in _BLOCK_END:
+            entry = self._parse_entry(expand_dotted, check_key=check_key)
             if entry:
                 entries.append(entry)
 
             # Skip commas (mixed separators now allowed)
-            if self._check(TokenType.COMMA):
+            if types[self.index] == _TT_COMMA:
                 self._advance()
 
-        if self._check(TokenType.EOF):
-            raise ParseError("unclosed object (missing `}`)", open_brace.span)
+        if types[self.index] == _TT_EOF:
+            raise ParseError("unclosed object (missing `}`)", self._span(open_brace))
 
-        end = self._expect(TokenType.RBRACE).span.end
-        return StyxObject(entries=entries, span=Span(start, end))
+        end = self.ends[self._expect(_TT_RBRACE)]
+        return StyxObject(entries, Span(start, end))
 
     def _parse_sequence(self) -> Sequence:
         """Parse a sequence."""
-        open_paren = self._expect(TokenType.LPAREN)
-        start = open_paren.span.start
+        open_paren = self._expect(_TT_LPAREN)
+        start = self.starts[open_paren]
         items: list[Value] = []
+        types = self.types
 
-        while not self._check(TokenType.RPAREN, TokenType.EOF):
+        while types[self.index] not in _SEQUENCE_END:
             # Check for comma - not allowed in sequences
-            if self._check(TokenType.COMMA):
+            if types[self.index] == _TT_COMMA:
                 raise ParseError(
                     "unexpected `,` in sequence (sequences are whitespace-separated, not comma-separated)",
-                    self.current.span,
+                    self._span(self.index),
                 )
             items.append(self._parse_value())
 
-        if self._check(TokenType.EOF):
-            raise ParseError("unclosed sequence (missing `)`)", open_paren.span)
+        if types[self.index] == _TT_EOF:
+            raise ParseError("unclosed sequence (missing `)`)", self._span(open_paren))
 
-        end = self._expect(TokenType.RPAREN).span.end
-        return Sequence(items=items, span=Span(start, end))
+        end = self.ends[self._expect(_TT_RPAREN)]
+        return Sequence(items, Span(start, end))
 
 
 def parse(source: str) -> Document:
@@ -39,6 +39,10 @@ class PathValueKind(Enum):
     TERMINAL = "terminal"  # Scalar, sequence, or tag-only value
 
 
+# The parser builds the node classes below with positional arguments (much cheaper than
+# keyword calls), so their field order must not change.
+
+
 @dataclass(slots=True)
 class Scalar:
     """A scalar value."""
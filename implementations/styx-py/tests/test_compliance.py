@@ -3,8 +3,14 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
+import os
 import re
 import subprocess
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
 from pathlib import Path
 
 import pytest
@@ -13,7 +19,14 @@ from styx.compliance import format_document, format_error
 from styx.parser import Parser
 from styx.types import ParseError
 
+# Error location in the Rust CLI's stderr
+_STDERR_RE = re.compile(r"parse error at (\d+)-(\d+): (.+)")
 
+# Error node in sexp output
+_ERROR_SEXP_RE = re.compile(r'\(error \[(\d+), (\d+)\] "([^"]*)"')
+
+
+@functools.cache
 def find_corpus_path() -> Path:
     """Find the compliance corpus directory."""
     candidates = [
@@ -26,6 +39,7 @@ def find_corpus_path() -> Path:
     pytest.skip("Could not find compliance corpus directory")
 
 
+@functools.cache
 def find_styx_cli() -> Path:
     """Find the styx CLI binary."""
     candidates = [
@@ -48,22 +62,34 @@ def get_python_output(content: str) -> str:
         return format_error(e)
 
 
-def get_rust_output(file_path: Path, styx_cli: Path) -> str:
-    """Get Rust reference output as sexp."""
+def get_rust_output(content: bytes, styx_cli: Path) -> tuple[str, bool]:
+    """Get Rust reference output as sexp, feeding the source on stdin.
+
+    Also returns whether the output is a definite result: a clean run, or a parse
+    error whose span was found in stderr. Anything else may come from a crashed or
+    killed process and should not be remembered.
+    """
     result = subprocess.run(
-        [str(styx_cli), "tree", "--format", "sexp", str(file_path)],
+        [str(styx_cli), "tree", "--format", "sexp", "-"],
+        input=content,
         capture_output=True,
-        text=True,
     )
-    if result.returncode != 0 and result.stderr:
+    stderr = result.stderr.decode("utf-8", errors="replace")
+    if result.returncode != 0 and stderr:
         # Extract error from stderr
-        return extract_error_from_stderr(result.stderr)
-    return result.stdout
+        return extract_error_from_stderr(stderr), _STDERR_RE.search(stderr) is not None
+    return result.stdout.decode("utf-8"), result.returncode == 0
+
+
+@functools.cache
+def read_corpus_file(path: Path) -> bytes:
+    """Read a corpus file once; the Python parser and the Rust CLI share the bytes."""
+    return path.read_bytes()
 
 
 def extract_error_from_stderr(stderr: str) -> str:
     """Extract error sexp from stderr."""
-    match = re.search(r"parse error at (\d+)-(\d+): (.+)", stderr)
+    match = _STDERR_RE.search(stderr)
     if match:
         start, end, msg = match.groups()
         return f'(error [{start}, {end}] "parse error at {start}-{end}: {msg}")'
@@ -72,21 +98,18 @@ def extract_error_from_stderr(stderr: str) -> str:
 
 def normalize_output(output: str) -> str:
     """Normalize output for comparison."""
-    lines = output.split("\n")
-    result = []
-    for line in lines:
-        trimmed = line.strip()
-        if trimmed.startswith("; file:"):
-            continue
-        if not trimmed:
-            continue
-        result.append(trimmed)
-    return "\n".join(result)
+    trimmed_lines = (line.strip() for line in output.split("\n"))
+    return "\n".join(
+        trimmed for trimmed in trimmed_lines if trimmed and not trimmed.startswith("; file:")
+    )
 
 
 def parse_error_span(output: str) -> tuple[tuple[int, int] | None, str]:
     """Extract error span and message from sexp output."""
-    match = re.search(r'\(error \[(\d+), (\d+)\] "([^"]*)"', output)
+    # Most outputs have no error node; a substring check is cheaper than the regex
+    if "(error [" not in output:
+        return None, ""
+    match = _ERROR_SEXP_RE.search(output)
     if match:
         start = int(match.group(1))
         end = int(match.group(2))
@@ -95,38 +118,40 @@ def parse_error_span(output: str) -> tuple[tuple[int, int] | None, str]:
     return None, ""
 
 
-def annotate_span(source: str, start: int, end: int, msg: str) -> str:
+def _line_index(source: str) -> tuple[list[str], list[int]]:
+    """Split source into lines along with the start offset of each line.
+
+    The newline ending a line counts as part of it.
+    """
+    lines = source.split("\n")
+    starts = list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+    return lines, starts
+
+
+def annotate_span(lines: list[str], starts: list[int], start: int, end: int, msg: str) -> str:
     """Show source with carets under the error span, handling multi-line spans."""
-    if start < 0 or end < 0 or start > len(source):
+    source_len = starts[-1] + len(lines[-1])
+    if start < 0 or end < 0 or start > source_len:
         return f"  [invalid span {start}-{end}]\n"
-    if end > len(source):
-        end = len(source)
-
-    # Find all lines that overlap with the span
-    lines = []
-    pos = 0
-    for line_text in source.split("\n"):
-        line_start = pos
-        line_end = pos + len(line_text)
-        # Check if this line overlaps with [start, end)
-        if line_end >= start and line_start < end:
-            lines.append((line_text, line_start, line_end))
-        pos = line_end + 1  # +1 for the newline
-        if line_start >= end:
-            break
-
-    if not lines:
+    if end > source_len:
+        end = source_len
+
+    # Only visit the lines that overlap with [start, end)
+    first = bisect_right(starts, start) - 1
+    last = bisect_left(starts, end) - 1
+    if first > last:
         return f"  [span {start}-{end} not found]\n"
 
     result = []
-    for line_text, line_start, line_end in lines:
+    for index in range(first, last + 1):
+        line_text = lines[index]
+        line_start = starts[index]
+        line_end = line_start + len(line_text)
         result.append(f"  {line_text}\n")
         # Calculate caret positions for this line
         caret_start = max(start, line_start) - line_start
         caret_end = min(end, line_end) - line_start
-        width = caret_end - caret_start
-        if width < 1:
-            width = 1
+        width = max(caret_end - caret_start, 1)
         result.append(f"  {' ' * caret_start}{'^' * width}\n")
     result.append(f"  {msg} ({start}-{end})\n")
     return "".join(result)
@@ -140,49 +165,156 @@ def annotate_error_diff(source: str, py_output: str, rust_output: str) -> str:
     if py_span is None and rust_span is None:
         return ""  # No errors to annotate
 
+    # Both annotations share one line table
+    source_lines, line_starts = _line_index(source)
     lines = ["\n"]
 
+    rust_annotation = None
     if rust_span is not None:
+        rust_annotation = annotate_span(
+            source_lines, line_starts, rust_span[0], rust_span[1], rust_msg
+        )
         lines.append("Expected error:\n")
-        lines.append(annotate_span(source, rust_span[0], rust_span[1], rust_msg))
+        lines.append(rust_annotation)
         lines.append("\n")
     else:
         lines.append("Expected: no error\n\n")
 
     if py_span is not None:
         lines.append("Got error:\n")
-        lines.append(annotate_span(source, py_span[0], py_span[1], py_msg))
+        # The same error annotates the same way; the mismatch is elsewhere in the output
+        if rust_annotation is not None and (py_span, py_msg) == (rust_span, rust_msg):
+            lines.append(rust_annotation)
+        else:
+            lines.append(annotate_span(source_lines, line_starts, py_span[0], py_span[1], py_msg))
     else:
         lines.append("Got: no error\n")
 
     return "".join(lines)
 
 
-def collect_styx_files():
+@functools.cache
+def collect_styx_files() -> list[Path]:
     """Collect all .styx files for parametrized testing."""
-    corpus_path = find_corpus_path()
-    return sorted(corpus_path.rglob("*.styx"))
-
-
-# Collect files at module load time for pytest parametrization
-try:
-    STYX_FILES = collect_styx_files()
-except Exception:
-    STYX_FILES = []
-
-
-@pytest.mark.parametrize(
-    "styx_file",
-    STYX_FILES,
-    ids=lambda p: str(p.relative_to(p.parent.parent.parent)),
-)
-def test_compliance(styx_file: Path):
+    files: list[Path] = []
+
+    # os.scandir gets file types from the directory listing, saving a stat per entry
+    def walk(directory: str) -> None:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    walk(entry.path)
+                elif entry.name.endswith(".styx") and entry.is_file():
+                    files.append(Path(entry.path))
+
+    walk(str(find_corpus_path()))
+    return sorted(files)
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    """Parametrize over the corpus files.
+
+    Every pytest-xdist worker collects the same sorted list, which keeps the test order
+    identical across workers as xdist requires.
+    """
+    if "styx_file" in metafunc.fixturenames:
+        files = collect_styx_files()
+        # Ids keep the corpus directory name, e.g. ``corpus/00-basic/empty.styx``
+        root = find_corpus_path().parent
+        metafunc.parametrize("styx_file", files, ids=[str(p.relative_to(root)) for p in files])
+
+
+class RustOutputs(dict[Path, str]):
+    """Rust reference output by corpus file, running the CLI for any file not seen yet.
+
+    Outputs are also kept in pytest's cache directory, keyed by a hash of the file
+    contents and the CLI binary, so later runs only start the CLI for changed files.
+    Only definite results are cached; a failed run is retried next time.
+    """
+
+    def __init__(self, styx_cli: Path, cache: pytest.Cache | None = None) -> None:
+        super().__init__()
+        self.styx_cli = styx_cli
+        self.cache = cache
+        # A rebuilt CLI may print different output for the same file
+        stat = styx_cli.stat()
+        self.cli_stamp = f"{styx_cli}:{stat.st_size}:{stat.st_mtime_ns}\0".encode()
+
+    def _cache_key(self, path: Path) -> str:
+        digest = hashlib.blake2b(self.cli_stamp, digest_size=16)
+        digest.update(read_corpus_file(path))
+        return f"styx/rust-output/{digest.hexdigest()}"
+
+    def _load(self, path: Path) -> str | None:
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(path), None)
+
+    def _store(self, path: Path, output: str, definite: bool) -> None:
+        self[path] = output
+        if definite and self.cache is not None:
+            self.cache.set(self._cache_key(path), output)
+
+    def _run(self, path: Path) -> tuple[str, bool]:
+        return get_rust_output(read_corpus_file(path), self.styx_cli)
+
+    def __missing__(self, path: Path) -> str:
+        output = self._load(path)
+        if output is None:
+            output, definite = self._run(path)
+            self._store(path, output, definite)
+        else:
+            self[path] = output
+        return output
+
+    def prefetch(self, paths: list[Path]) -> None:
+        """Run the CLI for many files at once from a thread pool, skipping cached ones."""
+        missing = []
+        for path in paths:
+            output = self._load(path)
+            if output is None:
+                missing.append(path)
+            else:
+                self[path] = output
+        with ThreadPoolExecutor() as pool:
+            for path, (output, definite) in zip(missing, pool.map(self._run, missing), strict=True):
+                self._store(path, output, definite)
+
+
+@pytest.fixture(scope="session")
+def styx_cli() -> Path:
+    """Path to the styx CLI binary."""
+    return find_styx_cli()
+
+
+@pytest.fixture(scope="session")
+def rust_outputs(request: pytest.FixtureRequest, styx_cli: Path) -> RustOutputs:
+    """Rust reference output for the corpus files this process runs.
+
+    The CLI handles one file per run, so in a plain run all selected files are started
+    up front from a thread pool to overlap their process startup. A pytest-xdist worker
+    (run with ``-n auto``) only gets its share of the tests, so it fills in lazily.
+    Either way, files whose output is already in pytest's cache skip the CLI.
+    """
+    outputs = RustOutputs(styx_cli, getattr(request.config, "cache", None))
+    if hasattr(request.config, "workerinput"):
+        return outputs
+
+    files = []
+    for item in request.session.items:
+        callspec = getattr(item, "callspec", None)
+        if callspec is not None and "styx_file" in callspec.params:
+            files.append(callspec.params["styx_file"])
+    outputs.prefetch(files)
+    return outputs
+
+
+def test_compliance(styx_file: Path, rust_outputs: RustOutputs):
     """Test Python parser against Rust reference for a single file."""
-    styx_cli = find_styx_cli()
-    content = styx_file.read_text()
+    content = read_corpus_file(styx_file).decode("utf-8")
 
     py_output = get_python_output(content)
-    rust_output = get_rust_output(styx_file, styx_cli)
+    rust_output = rust_outputs[styx_file]
 
     py_norm = normalize_output(py_output)
     rust_norm = normalize_output(rust_output)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Tests for the styx-compliance runner itself."""
+
+from __future__ import annotations
+
+import multiprocessing
+from typing import TYPE_CHECKING
+
+from styx import compliance
+from styx.compliance import process_file, process_files
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def test_crlf_spans_are_byte_offsets(tmp_path: Path):
+    """CRLF line endings are kept, so spans count the ``\\r`` as the Rust CLI does."""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    path = corpus / "crlf.styx"
+    path.write_bytes(b"a 1\r\nb 2\r\n")
+
+    output = process_file(path, corpus)
+
+    assert '(scalar [5, 6] bare "b")' in output
+    assert '(scalar [7, 8] bare "2")' in output
+
+
+def test_pool_output_matches_serial(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """The worker pool yields the same output, in the same order, as the serial path."""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    sources = ["a 1", "b {c 2}", "d )", 'e "\\u00e9"', "f.g 3\nf.h 4"]
+    paths = []
+    for i, source in enumerate(sources):
+        path = corpus / f"{i:02}.styx"
+        path.write_text(source, encoding="utf-8")
+        paths.append(path)
+
+    serial = [process_file(path, corpus) for path in paths]
+
+    pools = []
+
+    # spawn, the default on macOS, also checks that the worker pickles; it avoids
+    # forking pytest-xdist's threaded worker processes too
+    def spy_pool(processes: int):
+        pool = multiprocessing.get_context("spawn").Pool(processes)
+        pools.append(pool)
+        return pool
+
+    monkeypatch.setattr(compliance, "PARALLEL_MIN_FILES", 1)
+    monkeypatch.setattr(compliance.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(compliance, "Pool", spy_pool)
+
+    assert list(process_files(paths, corpus)) == serial
+    assert len(pools) == 1
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Parser tests for behaviour the compliance corpus does not cover."""
+
+from __future__ import annotations
+
+import pytest
+
+from styx.parser import Parser
+from styx.types import ParseError, Span
+
+
+@pytest.mark.parametrize(
+    ("source", "span"),
+    [
+        ('a )\nb "\\uZZZZ"', Span(2, 3)),
+        ('x {a )}\nb "\\u{110000}"', Span(5, 6)),
+        ('a )\nb "\\u{FFFFFFFFFFFFFFFFFFFF}"', Span(2, 3)),
+    ],
+)
+def test_syntax_error_before_bad_unicode_escape(source: str, span: Span):
+    """A syntax error is reported before a malformed escape later in the source."""
+    with pytest.raises(ParseError) as excinfo:
+        Parser(source).parse()
+    assert excinfo.value.span == span
+
+
+@pytest.mark.parametrize("source", ['"a.b" 1\na.b 2', 'a.b 1\n"a.b" 2'])
+def test_quoted_key_with_dot_is_not_a_path(source: str):
+    """A quoted ``"a.b"`` is one key, so it does not collide with the dotted path ``a.b``."""
+    doc = Parser(source).parse()
+    assert len(doc.entries) == 2
+
+
+def test_repeated_dotted_key_is_duplicate():
+    """Setting the same dotted path twice is still a duplicate key."""
+    with pytest.raises(ParseError) as excinfo:
+        Parser("a.b 1\na.b 2").parse()
+    assert excinfo.value.message == "duplicate key"
+    assert excinfo.value.span == Span(6, 9)
+
+
+def test_crlf_counts_toward_spans():
+    """Sources decoded from raw bytes keep ``\\r\\n``, and spans count both bytes."""
+    doc = Parser("a 1\r\nb 2").parse()
+    entry = doc.entries[1]
+    assert entry.key.span == Span(5, 6)
+    assert entry.value.span == Span(7, 8)